@@ -1,10 +1,21 @@
-from fastapi import APIRouter
+import hashlib
+
+from fastapi import APIRouter, Request, Response
 from app.api.schemas.common import HealthResponse
 
 router = APIRouter()
 
+# javob doim bir xil, shuning uchun ETag import paytida bir marta hisoblanadi
+HEALTH_ETAG = '"%s"' % hashlib.blake2b(b'{"status":"ok"}', digest_size=8).hexdigest()
+HEALTH_CACHE_CONTROL = "public, max-age=5"
+
+
 @router.get("/health", response_model=HealthResponse)
-async def healthcheck():
-    return HealthResponse(status="ok")
+async def healthcheck(request: Request, response: Response):
+    headers = {"Cache-Control": HEALTH_CACHE_CONTROL, "ETag": HEALTH_ETAG}
+    if request.headers.get("if-none-match") == HEALTH_ETAG:
+        return Response(status_code=304, headers=headers)
 
+    response.headers.update(headers)
+    return HealthResponse(status="ok")
 
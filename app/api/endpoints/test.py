@@ -1,24 +1,20 @@
-from decouple import config
-from fastapi import APIRouter
+import asyncio
+import hashlib
+
+import orjson
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from app.api.schemas.test import (
     QuestionResponse,
     AnswerResponse
 )
-from embedder import OpenRouterEmbedder
-from search import QdrantSemanticSearch
+from embedder import hash_text
+from search import ANSWER_SEPARATOR
 
 router = APIRouter()
-API_KEY = config("OPENROUTER_API_KEY")
-QDRANT_URL = config('QDRANT_URL')
-
 
-embedder = OpenRouterEmbedder(api_key=API_KEY, model="text-embedding-3-small")
-searcher = QdrantSemanticSearch(
-    qdrant_url=QDRANT_URL,
-    collection="play_kb",
-    embedder=embedder,
-    text_key="text",
-)
+# normallashtirilgan savol hash'i -> hozir bajarilayotgan qidiruv
+_inflight: dict[str, asyncio.Task] = {}
 
 # @router.post("/question/", response_model=AnswerResponse)
 # async def test(body: QuestionResponse):
@@ -56,14 +52,129 @@ searcher = QdrantSemanticSearch(
 #     return {"answer": res["text"], "status": "ok"}
 
 
-@router.post("/question/", response_model=AnswerResponse)
-async def question_api(body: QuestionResponse):
-    res = searcher.ask_many(body.question, top_k=12, score_threshold=None)
-    context = searcher.answer_text(res["matches"], max_chars=1800, max_chunks=6)
+@router.post(
+    "/question/",
+    response_model=AnswerResponse,
+    response_model_exclude_unset=True,
+    responses={200: {"content": {"text/plain": {}}, "description": "JSON, yoki ?stream=true bo‘lsa text/plain"}},
+)
+async def question_api(body: QuestionResponse, request: Request, response: Response, stream: bool = False):
+    key = hash_text(body.question)
+    result, matches = await _search_once(request.app.state, key, body.question)
+
+    if stream:
+        # kesh hit (matches yo‘q) bo‘lsa tayyor javob, aks holda bo‘laklar tanlanishi bilan
+        etag = _etag("text/plain", result["answer"].encode("utf-8"))
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        if matches is None:
+            return PlainTextResponse(result["answer"], headers={"ETag": etag})
+        return StreamingResponse(
+            _stream_answer(request.app.state.searcher, matches),
+            media_type="text/plain; charset=utf-8",
+            headers={"ETag": etag},
+        )
+
+    etag = _etag("application/json", orjson.dumps(result))
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return result
+
+
+def _etag(media_type: str, body: bytes) -> str:
+    """
+    Yuborilayotgan javob (media type + kontent) dan olingan weak ETag.
+    Weak, chunki JSON baytlarini FastAPI serializatsiya qiladi va bo‘shliqlari farq qilishi mumkin.
+    """
+    h = hashlib.blake2b(media_type.encode("ascii") + b"\x00" + body, digest_size=16)
+    return 'W/"%s"' % h.hexdigest()
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    # RFC 9110 §13.1.2 bo‘yicha GET/HEAD'dan boshqa metodlarda 412 qaytishi kerak.
+    # /question/ aslida xavfsiz, idempotent qidiruv: POST faqat savolni body'da yuborish uchun,
+    # shuning uchun qayta so‘rayotgan mijozga 304 beramiz, u o‘zidagi nusxadan foydalansin.
+    return request.headers.get("if-none-match") == etag
+
+
+async def _search(state, key: str, question: str):
+    """
+    Javobni topadi/yig‘adi va keshlarga yozadi. (result, matches) qaytaradi;
+    javob keshdan kelgan bo‘lsa matches None.
+    """
+    # 1) lokal keshlar: embedding LRU + semantic cache (tarmoqsiz)
+    vector = state.batcher.embedder.cached(question)
+    if vector is not None:
+        cached = state.semantic_cache.get(vector)
+        if cached is not None:
+            return cached, None
+
+    # 2) Redis (boshqa worker yoki oldingi deploy hisoblagan javob)
+    if state.redis is not None:
+        cached = await state.redis.get_answer(key)
+        if cached is not None:
+            # keyingi safar shu worker Redis'ga bormasin; embedding odatda Redis'da ham bor
+            if vector is None:
+                vector = await state.batcher.embed(question)
+            state.semantic_cache.put(vector, cached)
+            return cached, None
+
+    # 3) embed (LRU -> Redis -> OpenRouter) va yaqin savollar uchun semantic cache
+    if vector is None:
+        vector = await state.batcher.embed(question)
+        cached = state.semantic_cache.get(vector)
+        if cached is not None:
+            return cached, None
+
+    searcher = state.searcher
+    res = await searcher.ask_many(question, top_k=12, score_threshold=None, vector=vector)
+    matches = res["matches"]
+    context = searcher.answer_text(matches, is_noise=searcher.is_noise, max_chars=1800, max_chunks=6)
 
     if not context:
-        return {"answer": "Topilmadi.", "status": "ok", "matches": []}
+        return {"answer": "Topilmadi.", "status": "ok", "matches": []}, matches
+
+    result = {"answer": context, "status": "ok", "matches": matches[:5]}
+    # keshga yozish shu umumiy task ichida: qidiruvni boshlagan mijoz uzilib qolsa ham yoziladi
+    state.semantic_cache.put(vector, result)
+    if state.redis is not None:
+        await state.redis.set_answer(key, result)
+    return result, matches
+
+
+async def _search_once(state, key: str, question: str):
+    """
+    Bir xil savol bilan parallel kelgan so‘rovlar bitta embed + Qdrant
+    chaqiruvini kutadi (single-flight, worker ichida).
+    """
+    # get + set orasida await yo‘q, shuning uchun lock shart emas
+    task = _inflight.get(key)
+    if task is None:
+        # qidiruv alohida task: bitta so‘rov bekor qilinsa, qolganlari kutishda davom etadi
+        task = asyncio.create_task(_search(state, key, question))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _search_done(key, t))
+
+    return await asyncio.shield(task)
+
+
+def _search_done(key: str, task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # kutuvchi qolmagan bo‘lsa ham "never retrieved" ogohlantirishi chiqmasin
 
-    return {"answer": context, "status": "ok", "matches": res["matches"][:5]}
 
+async def _stream_answer(searcher, matches):
+    """
+    Bo‘laklarni tanlanishi bilan yuboradi (answer_text bilan bir xil kontent).
+    """
+    first = True
+    chunks = searcher.iter_answer_chunks(matches, is_noise=searcher.is_noise, max_chars=1800, max_chunks=6)
+    for t in chunks:
+        yield t if first else ANSWER_SEPARATOR + t
+        first = False
 
+    if first:
+        yield "Topilmadi."
@@ -1,10 +1,14 @@
-from pydantic import BaseModel
+from typing import Any, Dict, List
+
+from pydantic import BaseModel, Field
 
 
 class QuestionResponse(BaseModel):
-    question: str
+    question: str = Field(..., max_length=2048)
 
 
 class AnswerResponse(BaseModel):
     answer: str
+    status: str
+    matches: List[Dict[str, Any]] = []
 
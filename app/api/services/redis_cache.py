@@ -0,0 +1,94 @@
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+
+class RedisCache:
+    """
+    Worker'lar o‘rtasida umumiy va restart'dan keyin ham saqlanadigan kesh.
+    Redis ishlamay qolsa xatolar yutiladi va so‘rov keshsiz davom etadi;
+    birinchi xatodan keyin `backoff` soniya Redis'ga umuman murojaat qilinmaydi
+    (circuit breaker), shunda osilib qolgan Redis har so‘rovga timeout qo‘shmaydi.
+    """
+
+    EMBED_PREFIX = "emb:v1:"
+    ANSWER_PREFIX = "ans:v1:"
+
+    def __init__(
+        self,
+        url: str,
+        namespace: str = "",
+        embed_ttl: int = 604800,
+        answer_ttl: int = 86400,
+        timeout: float = 0.25,
+        backoff: float = 5.0,
+    ):
+        # qisqa timeout: osilib qolgan Redis /question/ ni to‘xtatib qo‘ymasin
+        self.r = Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        # javob collection + model'ga bog‘liq, umumiy Redis'da deploy'lar aralashmasin
+        self.answer_prefix = f"{self.ANSWER_PREFIX}{namespace}:"
+        self.embed_ttl = embed_ttl
+        self.answer_ttl = answer_ttl
+
+        self.backoff = backoff
+        self._down_until = 0.0
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _trip(self) -> None:
+        self._down_until = time.monotonic() + self.backoff
+
+    async def close(self) -> None:
+        await self.r.aclose()
+
+    async def get_embeddings(self, keys: List[str]) -> List[Optional[List[float]]]:
+        if not self._available():
+            return [None] * len(keys)
+        try:
+            raws = await self.r.mget([self.EMBED_PREFIX + k for k in keys])
+        except RedisError:
+            self._trip()
+            return [None] * len(keys)
+        # fp16 sifatida saqlangan, Qdrant'ga float list kerak
+        return [
+            np.frombuffer(raw, dtype=np.float16).astype(np.float32).tolist() if raw else None
+            for raw in raws
+        ]
+
+    async def set_embeddings(self, items: Dict[str, List[float]]) -> None:
+        if not self._available():
+            return
+        try:
+            async with self.r.pipeline(transaction=False) as pipe:
+                for k, vector in items.items():
+                    pipe.set(
+                        self.EMBED_PREFIX + k,
+                        np.asarray(vector, dtype=np.float16).tobytes(),
+                        ex=self.embed_ttl,
+                    )
+                await pipe.execute()
+        except RedisError:
+            self._trip()
+
+    async def get_answer(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self._available():
+            return None
+        try:
+            raw = await self.r.get(self.answer_prefix + key)
+        except RedisError:
+            self._trip()
+            return None
+        return orjson.loads(raw) if raw else None
+
+    async def set_answer(self, key: str, result: Dict[str, Any]) -> None:
+        if not self._available():
+            return
+        try:
+            await self.r.set(self.answer_prefix + key, orjson.dumps(result), ex=self.answer_ttl)
+        except RedisError:
+            self._trip()
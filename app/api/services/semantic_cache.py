@@ -0,0 +1,48 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticResultCache:
+    """
+    Yaqin (cosine >= threshold) savollar uchun oldingi javobni qaytaradi,
+    shunda Qdrant'ga qayta so‘rov yuborilmaydi.
+    """
+
+    def __init__(self, maxsize: int = 512, threshold: float = 0.92):
+        self.maxsize = maxsize
+        self.threshold = threshold
+
+        # (maxsize, dim) float32 matritsa birinchi put'da ajratiladi
+        self.vecs: Optional[np.ndarray] = None
+        self.n = 0
+        self._next = 0
+        self._results: List[Optional[Dict[str, Any]]] = [None] * maxsize
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def get(self, vector) -> Optional[Dict[str, Any]]:
+        if not self.n:
+            return None
+
+        scores = self.vecs[:self.n] @ self._normalize(vector)
+        idx = int(scores.argmax())
+        if scores[idx] >= self.threshold:
+            return self._results[idx]
+        return None
+
+    def put(self, vector, result: Dict[str, Any]) -> None:
+        v = self._normalize(vector)
+        if self.vecs is None:
+            self.vecs = np.empty((self.maxsize, v.shape[0]), dtype=np.float32)
+
+        # FIFO: to‘lganda eng eski slot ustidan yoziladi
+        i = self._next
+        self.vecs[i] = v
+        self._results[i] = result
+        self._next = (i + 1) % self.maxsize
+        self.n = min(self.n + 1, self.maxsize)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -14,5 +16,24 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     HTTP_TIMEOUT_SECONDS: float = 10.0
 
+    OPENROUTER_API_KEY: str
+    EMBED_MODEL: str = "text-embedding-3-small"
+
+    QDRANT_URL: str
+    QDRANT_COLLECTION: str = "play_kb"
+
+    EMBED_MAX_BATCH: int = 32
+    EMBED_MAX_WAIT_MS: float = 10.0
+
+    SEMANTIC_CACHE_SIZE: int = 512
+    SEMANTIC_HIT_THRESHOLD: float = 0.92
+
+    # berilmasa faqat lokal (process ichidagi) keshlar ishlaydi
+    REDIS_URL: Optional[str] = None
+    REDIS_EMBED_TTL_SECONDS: int = 7 * 24 * 3600
+    REDIS_ANSWER_TTL_SECONDS: int = 24 * 3600
+    REDIS_TIMEOUT_SECONDS: float = 0.25
+    REDIS_BACKOFF_SECONDS: float = 5.0
+
 
 settings = Settings()
@@ -1,15 +1,76 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 import httpx
 
 from app.core.config import settings
 from app.api.router import api_router
+from app.api.services.redis_cache import RedisCache
+from app.api.services.semantic_cache import SemanticResultCache
+from embedder import BatchingEmbedder, OpenRouterEmbedder
+from search import QdrantSemanticSearch
+
+
+OPENROUTER_WARMUP_URL = "https://openrouter.ai/api/v1/models"
+
+
+async def prewarm(app: FastAPI) -> None:
+    # DNS + TLS handshake startup'da bo‘lsin, birinchi so‘rovda emas; xatolar e'tiborsiz
+    await asyncio.gather(
+        app.state.http.get(OPENROUTER_WARMUP_URL, timeout=3.0),
+        asyncio.wait_for(app.state.searcher.q.get_collections(), timeout=3.0),
+        return_exceptions=True,
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.http = httpx.AsyncClient(timeout=settings.HTTP_TIMEOUT_SECONDS)
+    app.state.http = httpx.AsyncClient(
+        timeout=settings.HTTP_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        http2=True,
+    )
+
+    app.state.redis = None
+    if settings.REDIS_URL:
+        app.state.redis = RedisCache(
+            settings.REDIS_URL,
+            namespace=f"{settings.QDRANT_COLLECTION}:{settings.EMBED_MODEL}",
+            embed_ttl=settings.REDIS_EMBED_TTL_SECONDS,
+            answer_ttl=settings.REDIS_ANSWER_TTL_SECONDS,
+            timeout=settings.REDIS_TIMEOUT_SECONDS,
+            backoff=settings.REDIS_BACKOFF_SECONDS,
+        )
+
+    embedder = OpenRouterEmbedder(
+        api_key=settings.OPENROUTER_API_KEY,
+        model=settings.EMBED_MODEL,
+        client=app.state.http,
+        store=app.state.redis,
+    )
+    app.state.batcher = BatchingEmbedder(
+        embedder,
+        max_batch=settings.EMBED_MAX_BATCH,
+        max_wait_ms=settings.EMBED_MAX_WAIT_MS,
+    )
+    app.state.searcher = QdrantSemanticSearch(
+        qdrant_url=settings.QDRANT_URL,
+        collection=settings.QDRANT_COLLECTION,
+        embedder=embedder,
+        text_key="text",
+    )
+    app.state.semantic_cache = SemanticResultCache(
+        maxsize=settings.SEMANTIC_CACHE_SIZE,
+        threshold=settings.SEMANTIC_HIT_THRESHOLD,
+    )
+
+    await app.state.batcher.start()
+    await prewarm(app)
     yield
+    await app.state.batcher.stop()
+    await app.state.searcher.close()
+    if app.state.redis is not None:
+        await app.state.redis.close()
     await app.state.http.aclose()
 
 
@@ -20,7 +81,6 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
 
-    app.include_router(api_router, prefix=settings.API_V1_PREFIX)
     app.include_router(api_router, prefix=settings.API_V1_PREFIX)
     return app
 
@@ -1,25 +1,78 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from contextlib import suppress
+
+import httpx
 import requests
 from decouple import config
 
+
+def hash_text(text: str, *, salt: str = "") -> str:
+    """
+    Normallashtirilgan matndan (strip + lower) qisqa kesh kaliti yasaydi.
+    """
+    norm = (text or "").strip().lower()
+    h = hashlib.blake2b(f"{salt}\x00{norm}".encode("utf-8"), digest_size=16)
+    return h.hexdigest()
+
+
 class OpenRouterEmbedder:
     BASE_URL = "https://openrouter.ai/api/v1/embeddings"
 
-    def __init__(self, api_key: str, model: str = "text-embedding-3-small"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "text-embedding-3-small",
+        cache_size: int = 1024,
+        client: httpx.AsyncClient | None = None,
+        store=None,
+    ):
         self.api_key = api_key
         self.model = model
+        self.client = client
+        # ixtiyoriy ikkinchi daraja kesh (get_embeddings/set_embeddings), masalan Redis
+        self.store = store
+        # sync yo‘l (skriptlar) uchun keep-alive ulanishlar puli
+        self._session = requests.Session()
+
+        # (model, savol) -> embedding, LRU tartibida
+        self.cache_size = cache_size
+        self._embed_cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._cache_lock = asyncio.Lock()
+
+    def _cache_get(self, key: str) -> list[float] | None:
+        vector = self._embed_cache.get(key)
+        if vector is not None:
+            self._embed_cache.move_to_end(key)
+        return vector
 
-    def embed(self, text: str) -> list:
-        headers = {
+    def _cache_put(self, key: str, vector: list[float]) -> None:
+        self._embed_cache[key] = vector
+        self._embed_cache.move_to_end(key)
+        while len(self._embed_cache) > self.cache_size:
+            self._embed_cache.popitem(last=False)
+
+    def cached(self, text: str) -> list[float] | None:
+        """
+        Faqat lokal LRU'dan qidiradi (tarmoqqa chiqmaydi).
+        """
+        return self._cache_get(hash_text(text, salt=self.model))
+
+    @property
+    def headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
+    def _request(self, text: str) -> list[float]:
         payload = {
             "model": self.model,
             "input": text,
         }
 
-        response = requests.post(self.BASE_URL, headers=headers, json=payload)
+        response = self._session.post(self.BASE_URL, headers=self.headers, json=payload)
 
         if response.status_code != 200:
             raise Exception(f"Error: {response.text}")
@@ -29,6 +82,151 @@ class OpenRouterEmbedder:
 
         return embedding
 
+    def embed(self, text: str) -> list[float]:
+        key = hash_text(text, salt=self.model)
+        embedding = self._cache_get(key)
+        if embedding is not None:
+            return embedding
+
+        embedding = self._request(text)
+        self._cache_put(key, embedding)
+        return embedding
+
+    async def aembed(self, text: str) -> list[float]:
+        return (await self.aembed_many([text]))[0]
+
+    async def aembed_many(self, texts: list[str]) -> list[list[float]]:
+        """
+        Bir nechta matnni bitta `input=[...]` so‘rovi bilan embed qiladi.
+        """
+        keys = [hash_text(t, salt=self.model) for t in texts]
+        async with self._cache_lock:
+            embeddings = [self._cache_get(k) for k in keys]
+
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing and self.store is not None:
+            stored = await self.store.get_embeddings([keys[i] for i in missing])
+            async with self._cache_lock:
+                for i, embedding in zip(missing, stored):
+                    if embedding is not None:
+                        embeddings[i] = embedding
+                        self._cache_put(keys[i], embedding)
+            missing = [i for i in missing if embeddings[i] is None]
+
+        if not missing:
+            return embeddings
+
+        if self.client is None:
+            self.client = httpx.AsyncClient()
+
+        payload = {
+            "model": self.model,
+            "input": [texts[i] for i in missing],
+        }
+
+        response = await self.client.post(self.BASE_URL, headers=self.headers, json=payload)
+
+        if response.status_code != 200:
+            raise Exception(f"Error: {response.text}")
+
+        data = sorted(response.json()["data"], key=lambda d: d["index"])
+        if len(data) != len(missing):
+            raise Exception(f"Error: expected {len(missing)} embeddings, got {len(data)}")
+
+        async with self._cache_lock:
+            for i, item in zip(missing, data):
+                embeddings[i] = item["embedding"]
+                self._cache_put(keys[i], item["embedding"])
+
+        if self.store is not None:
+            await self.store.set_embeddings({keys[i]: embeddings[i] for i in missing})
+        return embeddings
+
+
+class BatchingEmbedder:
+    """
+    Qisqa oynada (max_wait_ms) kelgan parallel embed so‘rovlarini
+    bitta OpenRouter chaqiruviga birlashtiradi.
+    """
+
+    def __init__(self, embedder: OpenRouterEmbedder, max_batch: int = 32, max_wait_ms: float = 10):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+        # navbatda qolganlar shutdown'da osilib qolmasin
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("BatchingEmbedder stopped"))
+
+    async def embed(self, text: str) -> list[float]:
+        # batcher ishga tushmagan bo‘lsa (masalan, skriptlarda) to‘g‘ridan-to‘g‘ri
+        if self._task is None:
+            return await self.embedder.aembed(text)
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            try:
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # yig‘ilgan, lekin yuborilmagan batch ham kutuvchilarni osiltirmasin
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("BatchingEmbedder stopped"))
+                raise
+
+            # keyingi batch yig‘ilishi HTTP javobini kutib qolmasin
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        try:
+            embeddings = await self.embedder.aembed_many([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
 
 if __name__ == "__main__":
     API_KEY = config("OPENROUTER_API_KEY")
@@ -15,6 +15,7 @@ class OpenRouterEmbedder:
         self.api_key = api_key
         self.model = model
         self.timeout = timeout
+        self._session = requests.Session()
 
     def embed(self, text: str) -> list[float]:
         headers = {
@@ -23,7 +24,7 @@ class OpenRouterEmbedder:
         }
         payload = {"model": self.model, "input": text}
 
-        r = requests.post(self.BASE_URL, headers=headers, json=payload, timeout=self.timeout)
+        r = self._session.post(self.BASE_URL, headers=headers, json=payload, timeout=self.timeout)
         if r.status_code != 200:
             raise Exception(f"OpenRouter error {r.status_code}: {r.text}")
 
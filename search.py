@@ -1,31 +1,34 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, List
+from heapq import nlargest
+from typing import Any, Callable, Dict, Iterator, Optional, List
 import re
-import requests
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 
+from embedder import OpenRouterEmbedder
 
-class OpenRouterEmbedder:
-    BASE_URL = "https://openrouter.ai/api/v1/embeddings"
 
-    def __init__(self, api_key: str, model: str = "text-embedding-3-small", timeout: int = 60):
-        self.api_key = api_key
-        self.model = model
-        self.timeout = timeout
+# payload'dan matn qidiriladigan kalitlar (text_key topilmasa)
+_TEXT_KEYS = ("clean_text", "text", "body", "answer", "question")
 
-    def embed(self, text: str) -> list[float]:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        payload = {"model": self.model, "input": text}
+ANSWER_SEPARATOR = "\n\n---\n\n"
 
-        r = requests.post(self.BASE_URL, headers=headers, json=payload, timeout=self.timeout)
-        if r.status_code != 200:
-            raise Exception(f"OpenRouter error {r.status_code}: {r.text}")
 
-        return r.json()["data"][0]["embedding"]
+def _cut_at_sentence(text: str, limit: int) -> str:
+    """
+    Matnni `limit` dan oshmagan oxirgi gap (yoki so‘z) chegarasida kesadi.
+    Chegara limit'ning birinchi yarmida bo‘lsa, bo‘lak juda qisqarib ketmasligi uchun olinmaydi.
+    """
+    if len(text) <= limit:
+        return text
+    floor = limit // 2
+    cut = text.rfind(". ", 0, limit)
+    if cut >= floor:
+        return text[:cut + 1]
+    cut = text.rfind(" ", 0, limit)
+    if cut >= floor:
+        return text[:cut]
+    return text[:limit]
 
 
 class QdrantSemanticSearch:
@@ -39,49 +42,68 @@ class QdrantSemanticSearch:
         collection: str,
         embedder: OpenRouterEmbedder,
         text_key: str = "text",
+        prefer_grpc: bool = True,
+        timeout: int = 10,
     ):
-        self.q = QdrantClient(url=qdrant_url)
+        self.q = AsyncQdrantClient(url=qdrant_url, prefer_grpc=prefer_grpc, timeout=timeout)
         self.collection = collection
         self.embedder = embedder
         self.text_key = text_key
+        # Qdrant'dan faqat _extract_text o‘qiydigan maydonlarni olamiz
+        self._payload_keys = list(dict.fromkeys((text_key, *_TEXT_KEYS)))
+
+        # noise pattern'lar (hozircha telefon raqami) bitta regex'da
+        self._noise_re = re.compile(r"\+?\d[\d\s\-\(\)]{7,}\d")
+        self.is_noise = self._build_is_noise(self._noise_re, min_len=40)
 
-        self._phone_re = re.compile(r"\+?\d[\d\s\-\(\)]{7,}\d")
+    async def close(self) -> None:
+        await self.q.close()
 
     def _extract_text(self, payload: Dict[str, Any]) -> str:
         v = payload.get(self.text_key)
-        if isinstance(v, str) and v.strip():
-            return v.strip()
+        if isinstance(v, str):
+            v = v.strip()
+            if v:
+                return v
 
-        for k in ("clean_text", "text", "body", "answer", "question"):
+        for k in _TEXT_KEYS:
             vv = payload.get(k)
-            if isinstance(vv, str) and vv.strip():
-                return vv.strip()
+            if isinstance(vv, str):
+                vv = vv.strip()
+                if vv:
+                    return vv
         return ""
 
-    def _is_noise(self, text: str) -> bool:
-        if not text:
-            return True
-        t = text.strip()
-        if len(t) < 40:
-            return True
-        if self._phone_re.search(t):
-            return True
-        return False
-
-    def ask_many(
+    @staticmethod
+    def _build_is_noise(noise_re: re.Pattern, min_len: int) -> Callable[[str], bool]:
+        """
+        Har match uchun chaqiriladi, shuning uchun regex va chegara default
+        argumentlarga bog‘lanadi (self atribut lookup'larisiz lokal o‘zgaruvchilar).
+        """
+        def is_noise(text: str, _strip=str.strip, _search=noise_re.search, _min_len=min_len) -> bool:
+            if not text:
+                return True
+            t = _strip(text)
+            return len(t) < _min_len or _search(t) is not None
+
+        return is_noise
+
+    async def ask_many(
         self,
         question: str,
         *,
         top_k: int = 12,
         score_threshold: Optional[float] = None,
+        vector: Optional[List[float]] = None,
     ) -> Dict[str, Any]:
-        vector = self.embedder.embed(question)
+        if vector is None:
+            vector = await self.embedder.aembed(question)
 
-        res = self.q.query_points(
+        res = await self.q.query_points(
             collection_name=self.collection,
             query=vector,
             limit=top_k,
-            with_payload=True,
+            with_payload=self._payload_keys,
             with_vectors=False,
         )
 
@@ -105,51 +127,72 @@ class QdrantSemanticSearch:
 
         return {"found": len(items) > 0, "matches": items}
 
-    def answer_text(
-        self,
+    @staticmethod
+    def iter_answer_chunks(
         matches: List[Dict[str, Any]],
         *,
+        is_noise: Callable[[str], bool],
         max_chars: int = 1800,
         max_chunks: int = 6,
-    ) -> str:
+    ) -> Iterator[str]:
         """
-        Top-K natijadan foydali bo‘laklarni yig‘ib kontekst qiladi.
+        Top-K natijadan foydali bo‘laklarni birma-bir qaytaradi (streaming uchun).
         Noise bo‘laklarni tashlab ketadi, lekin hammasi noise bo‘lsa baribir qaytaradi.
+        Matnlar _extract_text'da allaqachon strip qilingan.
         """
         if not matches:
-            return ""
+            return
 
-        # score bo‘yicha sort (katta -> kichik)
-        matches = sorted(matches, key=lambda x: (x["score"] or 0.0), reverse=True)
+        # score bo‘yicha eng yaxshi nomzodlar (katta -> kichik), to‘liq sort shart emas
+        matches = nlargest(max_chunks * 3, matches, key=lambda x: x.get("score") or 0.0)
 
-        selected: List[str] = []
+        seen: set[str] = set()
+        count = 0
         total = 0
 
         # 1) avval noise bo‘lmaganlarini olamiz
         for m in matches:
-            t = (m.get("text") or "").strip()
-            if not t or self._is_noise(t):
-                continue
-            if t in selected:
+            t = m.get("text") or ""
+            if not t or t in seen or is_noise(t):
                 continue
+            seen.add(t)
 
-            if total + len(t) > max_chars:
+            tl = len(t)
+            if total + tl > max_chars:
                 remaining = max_chars - total
                 if remaining > 120:
-                    selected.append(t[:remaining])
+                    count += 1
+                    yield _cut_at_sentence(t, remaining)
                 break
 
-            selected.append(t)
-            total += len(t)
-            if len(selected) >= max_chunks:
+            count += 1
+            yield t
+            total += tl
+            if count >= max_chunks:
                 break
 
         # 2) agar hammasi noise bo‘lib qolsa, top1 ni qaytarib yuboramiz
-        if not selected:
-            t = (matches[0].get("text") or "").strip()
-            return t[:max_chars]
+        if not count:
+            t = matches[0].get("text") or ""
+            if t:
+                yield _cut_at_sentence(t, max_chars)
 
-        return "\n\n---\n\n".join(selected)
+    @staticmethod
+    def answer_text(
+        matches: List[Dict[str, Any]],
+        *,
+        is_noise: Callable[[str], bool],
+        max_chars: int = 1800,
+        max_chunks: int = 6,
+    ) -> str:
+        """
+        Top-K natijadan foydali bo‘laklarni yig‘ib kontekst qiladi.
+        """
+        return ANSWER_SEPARATOR.join(
+            QdrantSemanticSearch.iter_answer_chunks(
+                matches, is_noise=is_noise, max_chars=max_chars, max_chunks=max_chunks
+            )
+        )
 
 
 """
@@ -159,6 +202,8 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from decouple import config
 
+from embedder import OpenRouterEmbedder
+
 router = APIRouter()
 
 API_KEY = config("OPENROUTER_API_KEY")
@@ -182,8 +227,10 @@ class AnswerResponse(BaseModel):
 
 @router.post("/question/", response_model=AnswerResponse)
 async def question_api(body: QuestionResponse):
-    res = searcher.ask_many(body.question, top_k=12, score_threshold=None)
-    context = searcher.answer_text(res["matches"], max_chars=1800, max_chunks=6)
+    res = await searcher.ask_many(body.question, top_k=12, score_threshold=None)
+    context = searcher.answer_text(
+        res["matches"], is_noise=searcher.is_noise, max_chars=1800, max_chunks=6
+    )
 
     if not context:
         return {"answer": "Topilmadi.", "status": "ok", "matches": []}